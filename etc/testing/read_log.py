@@ -0,0 +1,8 @@
+import sys
+
+import msgpack
+
+# Prints a msgpack result log written by test_class.py
+with open(sys.argv[1], 'rb') as f:
+    for record in msgpack.Unpacker(f, raw=False):
+        print(f"{record['ts']} | {record['name']} | {record['status']} | {record['model']} | {record['result']}")
@@ -1,76 +1,163 @@
 from g4f.Provider import __all__, ProviderUtils
 from g4f import ChatCompletion
-import concurrent.futures
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import os
-from datetime import datetime
+import queue
+import sys
+import threading
+import time
+
+try:
+    import msgpack
+    has_msgpack = True
+except ImportError:
+    has_msgpack = False
 
 # Buat folder output & log
 base_dir = os.path.dirname(__file__)
 output_dir = os.path.join(base_dir, '..', '..', 'output')
 debug_dir = os.path.join(output_dir, 'debug')
-os.makedirs(output_dir, exist_ok=True)
+# debug_dir is nested in output_dir, so this creates both
 os.makedirs(debug_dir, exist_ok=True)
 
-timestamp = datetime.now().strftime('%d%m%Y-%H%M')
-log_file_path = os.path.join(output_dir, f'{timestamp}-test_provider.txt')
-debug_log_path = os.path.join(debug_dir, f'{timestamp}-provider_debug.txt')
+timestamp = time.strftime('%d%m%Y-%H%M')
+# The pid keeps runs started in the same minute from sharing log files
+run_id = f'{timestamp}-{os.getpid()}'
+# Results are msgpack records when available, read them back with read_log.py
+log_file_path = os.path.join(output_dir, f'{run_id}-test_provider.{"msgpack" if has_msgpack else "txt"}')
+debug_log_path = os.path.join(debug_dir, f'{run_id}-provider_debug.txt')
+LOG_BUFFER_SIZE = 1 << 20
+LOG_BATCH_SIZE = 32
+DEBUG_FLUSH_EVERY = 64
+MAX_WORKERS = 16
+# Attribute/dict dumps are diagnostic only and slow, enable with G4F_DEBUG=1
+DEBUG = os.environ.get("G4F_DEBUG") == "1"
+
+MODEL = 'gpt-3.5-turbo'
+STATUS_LABELS = ('🟢 working', '🔴 not working', '🔒 needs_auth')
+PREFIX = f"{timestamp}-test_provider"
 
-def get_status_label(working: bool, needs_auth: bool) -> str:
-    if needs_auth:
-        return '🔒 needs_auth'
-    if not working:
-        return '🔴 not working'
-    return '🟢 working'
+def emit(name: str, status: str, result: str, ok: bool = False) -> bytes:
+    # Print the line and pre-encode the record for the result log
+    detail = f"Model: {MODEL} | Method: ChatCompletion.create_async | {result}" if ok else result
+    line = f"{'✅' if ok else '❌'} {PREFIX} | {name} | {status} | {detail}\n"
+    sys.stdout.write(line)
+    if has_msgpack:
+        return msgpack.packb({"ts": timestamp, "name": name, "status": status, "model": MODEL, "result": result})
+    return line.encode()
 
-def test_provider(provider):
+def get_skip_result(provider_obj, supported: frozenset):
+    # Returns the Skipped line for providers that would make no request, else None
+    name = provider_obj.__name__
+    needs_auth = provider_obj.needs_auth
+    if not provider_obj.working or needs_auth:
+        return emit(name, STATUS_LABELS[2 if needs_auth else 1], "Skipped")
+    if MODEL not in supported:
+        return emit(name, "❗ no compatible model", "Skipped")
+    return None
+
+async def test_provider(provider, provider_obj, supported: frozenset, log_q: queue.Queue):
+    name = provider_obj.__name__
+    debug_lines = []
     try:
-        provider_obj = ProviderUtils.convert[provider]
-        status_label = get_status_label(provider_obj.working, provider_obj.needs_auth)
-        debug_lines = []
-
-        debug_lines.append(f"\n[DEBUG] Testing provider: {provider_obj.__name__}")
-        debug_lines.append(f"[DEBUG] Attributes: {dir(provider_obj)}")
-        debug_lines.append(f"[DEBUG] Dict: {getattr(provider_obj, '__dict__', {})}")
-        supported = getattr(provider_obj, "supported_models", [])
-        debug_lines.append(f"[DEBUG] Supported models: {supported}")
-
-        for line in debug_lines:
-            print(line)
-
-        with open(debug_log_path, "a") as debug_file:
-            debug_file.write("\n".join(debug_lines) + "\n")
-
-        # Coba kirim request jika working dan tidak butuh auth
-        if provider_obj.working and not provider_obj.needs_auth:
-            if 'gpt-3.5-turbo' not in supported:
-                result = f"❌ {timestamp}-test_provider | {provider_obj.__name__} | ❗ no compatible model | Skipped"
-                print(result)
-                return result
-
-            completion = ChatCompletion.create(
-                model='gpt-3.5-turbo',
-                messages=[{"role": "user", "content": "hello"}],
-                provider=provider_obj
-            )
-            result = f"✅ {timestamp}-test_provider | {provider_obj.__name__} | {status_label} | Model: gpt-3.5-turbo | Method: ChatCompletion.create | {completion}"
-            print(result)
-            return result
-        else:
-            result = f"❌ {timestamp}-test_provider | {provider_obj.__name__} | {status_label} | Skipped"
-            print(result)
-            return result
+        debug_lines.append(f"\n[DEBUG] Testing provider: {name}")
+        if DEBUG:
+            debug_lines.append(f"[DEBUG] Attributes: {dir(provider_obj)}")
+            debug_lines.append(f"[DEBUG] Dict: {getattr(provider_obj, '__dict__', {})}")
+        debug_lines.append(f"[DEBUG] Supported models: {sorted(supported)}")
+
+        # One write per block instead of one print per line
+        debug_text = "\n".join(debug_lines) + "\n"
+        sys.stdout.write(debug_text)
+        log_q.put(debug_text.encode())
+
+        # Sync providers are run in the loop's executor by their create_async
+        completion = await ChatCompletion.create_async(
+            model=MODEL,
+            messages=[{"role": "user", "content": "hello"}],
+            provider=provider_obj
+        )
+        return emit(name, STATUS_LABELS[0], str(completion), ok=True)
 
     except Exception as e:
-        error_msg = f"❌ {timestamp}-test_provider | {provider} | Failed to get response | Error: {e}"
-        print(error_msg)
-        with open(debug_log_path, "a") as debug_file:
-            debug_file.write(error_msg + "\n")
-        return error_msg
+        log_q.put(f"❌ {PREFIX} | {provider} | Failed to get response | Error: {e}\n".encode())
+        return emit(provider, "Failed to get response", f"Error: {e}")
+
+def debug_writer(log_q: queue.Queue, debug_file):
+    # Single consumer for the debug log, keeps file I/O off the event loop
+    count = 0
+    while True:
+        item = log_q.get()
+        if item is None:
+            break
+        debug_file.write(item)
+        count += 1
+        if count % DEBUG_FLUSH_EVERY == 0:
+            debug_file.flush()
+    debug_file.flush()
+
+async def result_writer(result_q: asyncio.Queue, f):
+    # Single consumer for the result log; disk writes get their own thread so
+    # they don't queue behind sync providers in the default executor
+    loop = asyncio.get_running_loop()
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix='provlog') as executor:
+        batch = []
+        while True:
+            item = await result_q.get()
+            if item is None:
+                break
+            batch.append(item)
+            if len(batch) >= LOG_BATCH_SIZE:
+                await loop.run_in_executor(executor, f.writelines, batch)
+                batch = []
+        if batch:
+            await loop.run_in_executor(executor, f.writelines, batch)
+        await loop.run_in_executor(executor, f.flush)
+
+async def bounded(spec, semaphore: asyncio.Semaphore, result_q: asyncio.Queue, log_q: queue.Queue):
+    async with semaphore:
+        result_q.put_nowait(await test_provider(*spec, log_q))
+
+def get_provider_spec(provider):
+    provider_obj = ProviderUtils.convert[provider]
+    # frozenset gives a hashed membership test for the model check
+    return provider, provider_obj, frozenset(getattr(provider_obj, "supported_models", ()) or ())
+
+provider_specs = [get_provider_spec(provider) for provider in __all__]
+
+async def main():
+    # Sync providers run in the default executor; size it for network I/O, not CPU count
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='provtest')
+    )
+    # Log files are opened once; each has a single writer that writes in batches
+    with open(log_file_path, 'wb', buffering=LOG_BUFFER_SIZE) as f, \
+         open(debug_log_path, 'ab', buffering=LOG_BUFFER_SIZE) as debug_file:
+        log_q = queue.Queue()
+        writer = threading.Thread(target=debug_writer, args=(log_q, debug_file))
+        writer.start()
+        try:
+            result_q = asyncio.Queue()
+            writer_task = asyncio.create_task(result_writer(result_q, f))
+
+            # Providers that would only be skipped are logged here, without a task
+            runnable = []
+            for spec in provider_specs:
+                skip_result = get_skip_result(*spec[1:])
+                if skip_result is None:
+                    runnable.append(spec)
+                else:
+                    result_q.put_nowait(skip_result)
+
+            semaphore = asyncio.Semaphore(MAX_WORKERS)
+            await asyncio.gather(*(bounded(spec, semaphore, result_q, log_q) for spec in runnable))
+            result_q.put_nowait(None)
+            await writer_task
+        finally:
+            # Always stop the debug writer, else the interpreter waits on it at exit
+            log_q.put(None)
+            writer.join()
 
 # Jalankan semua provider tanpa terkecuali
-with concurrent.futures.ThreadPoolExecutor() as executor:
-    futures = [executor.submit(test_provider, provider) for provider in __all__]
-    with open(log_file_path, 'w') as f:
-        for future in concurrent.futures.as_completed(futures):
-            if result := future.result():
-                f.write(result + '\n')
+asyncio.run(main())
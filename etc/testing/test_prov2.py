@@ -1,17 +1,37 @@
+import ast
 import asyncio  # For concurrency
+import bisect
+import concurrent.futures
 import datetime
+import functools
 import hashlib
 import inspect  # To get provider file info
 import json
+import operator
 import os
 import re
+import sqlite3
 import time
-import traceback  # For detailed error logging
+from contextlib import closing
 
 import aiohttp  # For async HTTP requests
 import requests  # Still used for synchronous fallback/initial check if needed
 from tqdm.asyncio import tqdm  # Async-compatible tqdm
 
+try:
+    import aiofiles  # For async file I/O
+
+    has_aiofiles = True
+except ImportError:
+    has_aiofiles = False
+
+try:
+    import orjson  # Faster JSON encode/decode when available
+
+    has_orjson = True
+except ImportError:
+    has_orjson = False
+
 # Assuming g4f is installed and these imports are correct
 # If g4f structure changed, these might need adjustment
 try:
@@ -73,14 +93,17 @@ except ImportError:
                 __file__ = _dummy_file_path
             except NameError:
                 __file__ = "dummy_provider_src.py"
-            if not os.path.exists(
-                __file__
-            ):  # Ensure dummy file exists if needed by get_provider_details
-                try:
-                    os.makedirs(os.path.dirname(__file__), exist_ok=True)
-                    open(__file__, "a").close()
-                except:
-                    pass  # Ignore errors creating dummy file
+
+            @classmethod
+            def _ensure_src(cls):
+                """Creates the dummy source file on first use by get_provider_details."""
+                if not os.path.exists(cls.__file__):
+                    try:
+                        os.makedirs(os.path.dirname(cls.__file__) or ".", exist_ok=True)
+                        open(cls.__file__, "a").close()
+                    except OSError:
+                        pass  # Ignore errors creating dummy file
+                return cls.__file__
 
             def __init__(self, name="Dummy", needs_auth=False, url="http://dummy.com"):
                 self.name = name
@@ -143,24 +166,46 @@ CONFIG = {
     "provider_test_timeout": 45,  # Timeout for individual g4f calls
     "max_source_code_length": 10000,
     "max_concurrent_tests": 10,  # Limit concurrency
+    "ai_max_concurrency": 4,  # Concurrent calls to the AI endpoint, independent of tests
     "test_prompts": [
         {"type": "greeting", "content": "hello"},
         {"type": "question", "content": "What is the capital of France?"},
         {"type": "instruction", "content": "Translate 'good morning' to Spanish"},
     ],
     "skip_working_ai_calls": True,  # Skip AI calls for providers marked ✅ Working / ✅ Mostly Working
+    "db_flush_interval": 1.0,  # Seconds to batch database updates before writing
+    "ai_cache_path": ".cache/db/ai_cache.sqlite",  # Persistent AI answer cache
+    "ai_cache_ttl": 7 * 86400,  # Seconds before cached AI answers expire
+    # Per-prompt / per-AI-call progress lines, set G4F_PROV2_VERBOSE=0 to silence
+    "verbose": os.environ.get("G4F_PROV2_VERBOSE", "1") == "1",
 }
 
 # Use prompts from config
 PROMPTS_TO_RUN = CONFIG["test_prompts"][:3]  # Use first 3 or adjust slice
 
-# --- Global Lock for Synchronous File I/O ---
-# Using asyncio Lock is generally preferred in async code, but file I/O can be tricky.
-# A simple threading Lock combined with sync file operations might be safer if concurrency issues arise.
-# For this version, sticking to the synchronous file lock approach within the async flow.
-db_file_lock = (
-    asyncio.Lock()
-)  # Use asyncio Lock for coordinating access to sync file ops
+# Patterns for extracting fallback models from "model not supported" errors
+_VALID_MODELS_RE = re.compile(
+    r"(?:Valid|Available|Supported)\smodels?:\s*(\[.*?\]|\{.*?\}|\S+)", re.IGNORECASE
+)
+_MODEL_LIST_RE = re.compile(r"['\"]([A-Za-z0-9_\-./:]+)['\"]")
+
+# --- In-Memory Database State ---
+# Results are merged into db_state (keyed by id) and written out by db_flusher,
+# db_file_lock serializes the actual file writes.
+db_state = {}
+db_sorted_ids = []  # db_state keys kept in id order, so flushes never re-sort
+db_unkeyed = []  # Loaded entries without an id, written back unchanged ahead of the rest
+db_dirty = asyncio.Event()
+db_file_lock = asyncio.Lock()
+
+# Dedicated pool for blocking g4f calls, so they don't queue behind other to_thread
+# users (database file I/O, os.replace). probe_rest sends every remaining prompt of a provider
+# at once, so each concurrent test needs that many threads or prompts would burn
+# their timeout waiting in the executor queue.
+G4F_EXECUTOR = concurrent.futures.ThreadPoolExecutor(
+    max_workers=CONFIG["max_concurrent_tests"] * max(1, len(PROMPTS_TO_RUN) - 1),
+    thread_name_prefix="g4f",
+)
 
 # --- SECURITY WARNING ---
 print("\033[91m" + "=" * 80)
@@ -175,27 +220,63 @@ print("=" * 80 + "\033[0m")
 # --- Helper Functions ---
 
 
+def json_dumps(data, indent=False):
+    """Serializes to str, using orjson when installed."""
+    if has_orjson:
+        return json_dumps_bytes(data, indent).decode()
+    return json.dumps(data, indent=2 if indent else None, ensure_ascii=False)
+
+
+def json_dumps_bytes(data, indent=False):
+    """Serializes straight to UTF-8 bytes, skipping the str round trip with orjson."""
+    if has_orjson:
+        option = orjson.OPT_NON_STR_KEYS  # Same key handling as the stdlib json
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, option=option)
+    return json.dumps(data, indent=2 if indent else None, ensure_ascii=False).encode("utf-8")
+
+
+json_loads = orjson.loads if has_orjson else json.loads
+
+
+@functools.lru_cache(maxsize=1024)
 def generate_provider_id(provider_name):
     if not provider_name:
         return None
-    hash_object = hashlib.sha1(provider_name.encode("utf-8"))
+    # The id is only a stable key, not a security boundary
+    hash_object = hashlib.sha1(provider_name.encode("utf-8"), usedforsecurity=False)
     return hash_object.hexdigest()[:12]
 
 
-# Note: load_results and update_database_entry remain synchronous for file I/O safety
-# but acquire the asyncio lock before operating.
+# Note: database reads/writes run off the event loop (aiofiles when installed,
+# else a worker thread) so it keeps running other tests.
+
 
+def _read_text(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
 
-def load_results_sync(db_path=CONFIG["db_path"]):
-    """Synchronous load, ensures source code is removed."""
+
+def _write_bytes(path, payload):
+    with open(path, "wb", buffering=1 << 20) as f:
+        f.write(payload)
+
+
+async def load_results_async(db_path=CONFIG["db_path"]):
+    """Async load off the event loop, ensures source code is removed."""
     if os.path.exists(db_path):
         try:
-            with open(db_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                for item in data:
-                    item.pop("provider_source_code", None)
-                return data
-        except json.JSONDecodeError:
+            if has_aiofiles:
+                async with aiofiles.open(db_path, "r", encoding="utf-8") as f:
+                    text = await f.read()
+            else:
+                text = await asyncio.to_thread(_read_text, db_path)
+            data = json_loads(text)
+            for item in data:
+                item.pop("provider_source_code", None)
+            return data
+        except ValueError:  # json/orjson decode errors
             print(f"Warning: Could not decode JSON from {db_path}. Starting empty.")
             return []
         except Exception as e:
@@ -204,87 +285,91 @@ def load_results_sync(db_path=CONFIG["db_path"]):
     return []
 
 
-async def update_database_entry(new_result, db_path=CONFIG["db_path"]):
-    """Async wrapper to load, update/append a single entry, and save the database safely."""
+async def write_results_async(data, db_path=CONFIG["db_path"]):
+    """Writes data to a temporary file and atomically replaces db_path, acquires lock."""
+    temp_path = db_path + ".tmp"
+    async with db_file_lock:
+        try:
+            payload = json_dumps_bytes(data, indent=True)
+            if has_aiofiles:
+                async with aiofiles.open(temp_path, "wb", buffering=1 << 20) as f:
+                    await f.write(payload)
+            else:
+                await asyncio.to_thread(_write_bytes, temp_path, payload)
+            await asyncio.to_thread(os.replace, temp_path, db_path)
+            return True
+        except Exception as e:
+            print(f"\nError saving data to {db_path}: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)  # Clean up temp file on error
+            return False
+
+
+async def update_database_entry(new_result):
+    """Merges a single entry into db_state and marks it dirty for the flusher."""
     if not new_result or "id" not in new_result:
         print("Error: Invalid result passed to update_database_entry.")
         return
 
     entry_to_save = new_result.copy()
-    entry_to_save.pop("provider_source_code", None)
     entry_id = entry_to_save["id"]
 
-    # Acquire the asyncio lock before performing synchronous file I/O
-    async with db_file_lock:
-        try:
-            # Load data synchronously inside the lock
-            all_data = load_results_sync(db_path)
-
-            # Find and update or append (logic remains the same)
-            found = False
-            for i, existing_item in enumerate(all_data):
-                if existing_item.get("id") == entry_id:
-                    if "rank" in existing_item and "rank" not in entry_to_save:
-                        entry_to_save["rank"] = existing_item["rank"]
-                    if (
-                        "ai_solution" not in entry_to_save
-                        or not entry_to_save["ai_solution"]
-                        or "N/A" in entry_to_save["ai_solution"]
-                    ):
-                        if existing_item.get(
-                            "ai_solution"
-                        ) and "N/A" not in existing_item.get("ai_solution"):
-                            entry_to_save["ai_solution"] = existing_item["ai_solution"]
-                    if "tags" not in entry_to_save or not entry_to_save["tags"]:
-                        if existing_item.get("tags"):
-                            entry_to_save["tags"] = existing_item["tags"]
-                    all_data[i] = entry_to_save
-                    found = True
-                    break
-            if not found:
-                all_data.append(entry_to_save)
-
-            # Save updated data using temporary file (sync operations)
-            temp_path = db_path + ".tmp"
-            try:
-                all_data.sort(
-                    key=lambda x: x.get("id", "")
-                )  # Sort by ID for consistency
-                with open(temp_path, "w", encoding="utf-8") as f:
-                    json.dump(all_data, f, indent=2, ensure_ascii=False)
-                os.replace(temp_path, db_path)
-            except Exception as e:
-                print(f"\nError saving updated data sync to {db_path}: {e}")
-                if os.path.exists(temp_path):
-                    os.remove(temp_path)  # Clean up temp file on error
+    existing_item = db_state.get(entry_id)
+    if existing_item:
+        if "rank" in existing_item and "rank" not in entry_to_save:
+            entry_to_save["rank"] = existing_item["rank"]
+        if (
+            "ai_solution" not in entry_to_save
+            or not entry_to_save["ai_solution"]
+            or "N/A" in entry_to_save["ai_solution"]
+        ):
+            if existing_item.get("ai_solution") and "N/A" not in existing_item.get(
+                "ai_solution"
+            ):
+                entry_to_save["ai_solution"] = existing_item["ai_solution"]
+        if "tags" not in entry_to_save or not entry_to_save["tags"]:
+            if existing_item.get("tags"):
+                entry_to_save["tags"] = existing_item["tags"]
+    else:
+        bisect.insort(db_sorted_ids, entry_id)  # New entry, keep flush order sorted
+    db_state[entry_id] = entry_to_save
+    db_dirty.set()
 
-        except Exception as e:
-            # Catch errors during the locked operation
-            print(f"\nError during locked database update for {entry_id}: {e}")
-        # Lock is automatically released when exiting 'async with' block
+
+async def db_flusher(db_path=CONFIG["db_path"]):
+    """Background task: writes db_state at most once per flush interval while dirty."""
+    try:
+        while True:
+            await db_dirty.wait()
+            await asyncio.sleep(CONFIG["db_flush_interval"])  # Debounce further updates
+            await _flush_db_state(db_path)
+    except asyncio.CancelledError:
+        # Results still in the debounce window would be lost on interrupt otherwise
+        if db_dirty.is_set():
+            await _flush_db_state(db_path)
+        raise
+
+
+async def _flush_db_state(db_path):
+    db_dirty.clear()
+    all_data = db_unkeyed + [db_state[entry_id] for entry_id in db_sorted_ids]
+    write = asyncio.ensure_future(write_results_async(all_data, db_path))
+    try:
+        await asyncio.shield(write)
+    except asyncio.CancelledError:
+        # The writer thread keeps writing the tmp file, let it finish first
+        await write
+        raise
 
 
-# Note: save_final_ranked_results also needs to acquire the lock
 async def save_final_ranked_results(data, db_path=CONFIG["db_path"]):
-    """Saves the final ranked list, acquires lock."""
-    data_to_save = []
-    for item in data:
-        saved_item = item.copy()
-        saved_item.pop("provider_source_code", None)
-        data_to_save.append(saved_item)
-    data_to_save.sort(key=lambda x: (x.get("rank", float("inf")), x.get("id", "")))
-
-    async with db_file_lock:  # Acquire lock for final save
-        try:
-            temp_path = db_path + ".tmp"
-            with open(temp_path, "w", encoding="utf-8") as f:
-                json.dump(data_to_save, f, indent=2, ensure_ascii=False)
-            os.replace(temp_path, db_path)
-            print(f"\n💾 Final ranked results saved to {db_path}.")
-        except Exception as e:
-            print(f"\nError saving final ranked results to {db_path}: {e}")
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
+    """Saves the final ranked list."""
+    data_to_save = sorted(
+        data, key=lambda x: (x.get("rank", float("inf")), x.get("id", ""))
+    )
+
+    if await write_results_async(data_to_save, db_path):
+        print(f"\n💾 Final ranked results saved to {db_path}.")
 
 
 # --- Core Logic (Status, Advice, Score - remain synchronous) ---
@@ -300,27 +385,35 @@ ADVICE_MAP = {
 }  # Shorter advice map
 
 
+# One pass over the error text, each match is classified by its group name
+_ERROR_RE = re.compile(
+    r"(?P<auth>auth|key)|(?P<rate>rate limit)|(?P<net>connection|network|timeout)"
+    r"|(?P<model>model)|(?P<support>support|found)",
+    re.IGNORECASE,
+)
+
+
+def classify_error(error):
+    """Returns the set of error categories found in the error text."""
+    if not error:
+        return set()
+    return {match.lastgroup for match in _ERROR_RE.finditer(str(error))}
+
+
 def generate_advice(status, error=None, needs_auth=False, success_ratio=1.0):
     base = ADVICE_MAP.get(status, ADVICE_MAP["❓ Unknown"])
     if status == "✅ Mostly Working":
         base += f" ({int(success_ratio * 100)}% OK)"
     # Simplified hints
-    if error:
-        error_lower = str(error).lower()
-        if "auth" in error_lower or "key" in error_lower:
-            base = ADVICE_MAP["🔒 Needs Auth"]
-        elif "rate limit" in error_lower:
-            base += " (Rate Limit?)"
-        elif (
-            "connection" in error_lower
-            or "network" in error_lower
-            or "timeout" in error_lower
-        ):
-            base += " (Network Error?)"
-        elif "model" in error_lower and (
-            "support" in error_lower or "found" in error_lower
-        ):
-            base += " (Model Error?)"
+    kinds = classify_error(error)
+    if "auth" in kinds:
+        base = ADVICE_MAP["🔒 Needs Auth"]
+    elif "rate" in kinds:
+        base += " (Rate Limit?)"
+    elif "net" in kinds:
+        base += " (Network Error?)"
+    elif "model" in kinds and "support" in kinds:
+        base += " (Model Error?)"
     if status == "🔒 Needs Auth" and not needs_auth:
         base += " (Auth Terdeteksi!)"
     return base
@@ -337,46 +430,43 @@ def evaluate_status_from_logs(logs, needs_auth=False):
     fallback_failed = latest_log.get("status") == "❌ Fallback Failed"
     if prompts_tested == 0:
         return "❓ Unknown"
-    success_ratio = prompts_succeeded / prompts_tested if prompts_tested > 0 else 0
-    auth_error_detected = (
-        "auth" in (error or "").lower() or "key" in (error or "").lower()
-    )
-    if needs_auth or auth_error_detected:
-        if needs_auth and (success_ratio == 0 or auth_error_detected):
-            return "🔒 Needs Auth"
+    success_ratio = prompts_succeeded / prompts_tested
+    # Only classify the error when it can change the outcome
+    if needs_auth and (success_ratio == 0 or "auth" in classify_error(error)):
+        return "🔒 Needs Auth"
     if success_ratio == 0:
         return "❌ Fallback Failed" if fallback_failed else "❌ Not Working"
-    if 0 < success_ratio < 1:
+    if success_ratio < 1:
         return "⚠️ Unstable"
-    if (
-        success_ratio == 1.0
-        and avg_response_time is not None
-        and avg_response_time > 15
-    ):
-        return "⏳ Slow Response"
-    if success_ratio == 1.0:
+    if success_ratio == 1:
+        if avg_response_time is not None and avg_response_time > 15:
+            return "⏳ Slow Response"
         return "✅ Working"
     return "❓ Unknown"
 
 
+STATUS_PENALTY = {
+    "⏳ Slow Response": 15,
+    "⚠️ Unstable": 25,
+    "🔒 Needs Auth": 10,
+    "❌ Fallback Failed": 35,
+    "❌ Not Working": 30,
+}
+
+
 def calculate_score(result):
-    score = 0
     prompts_tested = result.get("prompts_tested_count", 0)
-    prompts_succeeded = result.get("prompts_successful_count", 0)
-    response_time = result.get("response_time")
-    fallback = result.get("fallback", False)
-    status = result.get("status", "❓ Unknown")
     if prompts_tested == 0:
         return 1
+    prompts_succeeded = result.get("prompts_successful_count", 0)
+    response_time = result.get("response_time")
     success_ratio = prompts_succeeded / prompts_tested
     if success_ratio == 1.0:
-        score += 70
+        score = 80
     elif success_ratio >= 0.5:
-        score += 40
+        score = 40
     else:
-        score += 10
-    if success_ratio == 1.0:
-        score += 10
+        score = 10
     if prompts_succeeded > 0 and response_time is not None:
         if response_time < 3:
             score += 20
@@ -384,17 +474,8 @@ def calculate_score(result):
             score += 10
         elif response_time < 15:
             score += 5
-    if status == "⏳ Slow Response":
-        score -= 15
-    elif status == "⚠️ Unstable":
-        score -= 25
-    elif status == "🔒 Needs Auth":
-        score -= 10
-    elif status == "❌ Fallback Failed":
-        score -= 35
-    elif status == "❌ Not Working":
-        score -= 30
-    if fallback:
+    score -= STATUS_PENALTY.get(result.get("status"), 0)
+    if result.get("fallback", False):
         score -= 10
     return max(1, min(100, int(score)))
 
@@ -405,17 +486,16 @@ def rank_providers(all_data):
     if not all_data:
         print("📦 Tidak ada data untuk diranking.")
         return []
+    # Single pass: score each provider and build its sort key alongside
+    keyed = []
     for res in all_data:
-        res["score"] = calculate_score(res)
-    sorted_providers = sorted(
-        all_data,
-        key=lambda r: (
-            r.get("score", 0),
-            r.get("prompts_successful_count", 0) / r.get("prompts_tested_count", 1),
-            r.get("id", ""),
-        ),
-        reverse=True,
-    )
+        res["score"] = score = calculate_score(res)
+        ratio = res.get("prompts_successful_count", 0) / (
+            res.get("prompts_tested_count") or 1
+        )
+        keyed.append((score, ratio, res.get("id", ""), res))
+    keyed.sort(key=operator.itemgetter(0, 1, 2), reverse=True)
+    sorted_providers = [k[3] for k in keyed]
     print("\n🏅 Hasil Peringkat Sementara:")
     for rank, res in enumerate(sorted_providers, 1):
         res["rank"] = rank  # Assign rank in memory
@@ -428,8 +508,30 @@ def rank_providers(all_data):
     return sorted_providers
 
 
+@functools.lru_cache(maxsize=512)
+def _get_source_file(provider_class):
+    """Cached inspect.getfile lookup per provider class."""
+    return inspect.getfile(provider_class)
+
+
+@functools.lru_cache(maxsize=512)
+def _read_source(file_path):
+    """Reads a provider source file once, truncated to max_source_code_length."""
+    with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
+        source_code = f.read()
+    if len(source_code) > CONFIG["max_source_code_length"]:
+        source_code = (
+            source_code[: CONFIG["max_source_code_length"]] + "\n\n... [TRUNCATED]"
+        )
+    return source_code
+
+
+# id(provider_obj) -> (provider_obj, details), provider instances are long-lived singletons
+_details_cache = {}
+
+
 def get_provider_details(provider_obj):
-    """Gets provider details (sync function)."""
+    """Gets provider details (sync function), cached per provider instance."""
     details = {
         "provider_file_path": "N/A",
         "provider_source_code": "N/A",
@@ -437,14 +539,21 @@ def get_provider_details(provider_obj):
     }
     if provider_obj is None:
         return details
+    cached = _details_cache.get(id(provider_obj))
+    if cached and cached[0] is provider_obj:
+        return cached[1]
     try:
         provider_class = provider_obj.__class__
-        file_path = inspect.getfile(provider_class)
+        if hasattr(provider_class, "_ensure_src"):  # Dummy provider (g4f missing)
+            file_path = provider_class._ensure_src()
+        else:
+            file_path = _get_source_file(provider_class)
         details["provider_file_path"] = file_path
         if os.path.exists(file_path):
             try:
-                with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-                    details["provider_source_code"] = f.read()
+                details["provider_source_code"] = _read_source(
+                    os.path.realpath(file_path)
+                )
             except Exception as e:
                 details["provider_source_code"] = f"Error reading file: {e}"
         else:
@@ -460,23 +569,65 @@ def get_provider_details(provider_obj):
         details["provider_parameters"] = params
     except Exception:
         details["provider_parameters"] = {"error": "Failed to get parameters"}
+    _details_cache[id(provider_obj)] = (provider_obj, details)
     return details
 
 
 # --- Async External AI Calls ---
 
 
+# Queue of (future, call factory) served by ai_worker tasks while a run is active
+ai_queue = None
+
+
+async def ai_worker(queue):
+    """Background task: runs queued AI calls one at a time and resolves their futures."""
+    while True:
+        future, call = await queue.get()
+        try:
+            if not future.cancelled():
+                future.set_result(await call())
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        finally:
+            queue.task_done()
+
+
 async def _call_external_ai_async(session, payload, purpose="solusi"):
+    """Routes the AI call through ai_queue when workers are running, else calls directly."""
+    call = functools.partial(_post_external_ai_async, session, payload, purpose)
+    if ai_queue is None:
+        return await call()
+    future = asyncio.get_running_loop().create_future()
+    ai_queue.put_nowait((future, call))
+    return await future
+
+
+async def _post_external_ai_async(session, payload, purpose="solusi"):
     """Async function to make the POST request using aiohttp session."""
     url = CONFIG["ai_solution_endpoint_url"]
-    timeout = aiohttp.ClientTimeout(total=CONFIG["request_timeout"])
-    headers = {"accept": "application/json", "Content-Type": "application/json"}
     try:
-        async with session.post(
-            url, json=payload, headers=headers, timeout=timeout
-        ) as response:
+        # Headers and timeout are configured once on the shared session
+        async with session.post(url, json=payload) as response:
             response.raise_for_status()  # Check for HTTP errors
-            response_json = await response.json()
+            if "text/event-stream" in response.headers.get("Content-Type", ""):
+                # Streamed completion: keep only the content deltas
+                parts = []
+                async for line in response.content:
+                    if not line.startswith(b"data: "):
+                        continue
+                    data = line[6:].strip()
+                    if data == b"[DONE]":
+                        break
+                    choices = json_loads(data).get("choices")
+                    if choices:
+                        parts.append((choices[0].get("delta") or {}).get("content") or "")
+                if not parts:
+                    return f"Gagal ({purpose}): 'choices' field missing/empty."
+                return "".join(parts).strip()
+            # Endpoint ignored stream=True and sent a single JSON body
+            response_json = await response.json(loads=json_loads)
             if (
                 response_json
                 and "choices" in response_json
@@ -493,54 +644,207 @@ async def _call_external_ai_async(session, payload, purpose="solusi"):
         return f"Gagal ({purpose}): Timeout ({CONFIG['request_timeout']}s)."
     except aiohttp.ClientError as e:
         return f"Gagal ({purpose}): {type(e).__name__} - {e}"
-    except json.JSONDecodeError:
+    except ValueError:  # json/orjson decode errors
         return f"Gagal ({purpose}): Respons JSON tidak valid."
     except Exception as e:
         return f"Gagal ({purpose}): {type(e).__name__} - {e}"
 
 
-async def query_openai_solution_async(session, result):
-    """Async: Queries the external AI for troubleshooting & analysis."""
+def skip_ai_calls(result):
+    """True if AI calls are skipped for this result (✅ status and skip_working_ai_calls)."""
+    return CONFIG["skip_working_ai_calls"] and str(result.get("status", "")).startswith(
+        "✅"
+    )
+
+
+def is_ai_failure(text):
+    """True for the "Gagal (<purpose>): ..." markers returned by _call_external_ai_async."""
+    return text.startswith("Gagal (")
+
+
+# (status, error, source) digest -> Future of the AI analysis, shared by duplicate failures
+_ai_analysis_cache = {}
+# (status, error) digest -> Future of the tags-only answer
+_ai_tags_cache = {}
+
+# Bump when the solution/tags prompts change so old cached answers are ignored
+AI_CACHE_VERSION = "v2"
+
+
+def ai_cache_key(*parts):
+    """Stable digest of the parts that determine an AI answer."""
+    canonical = json.dumps([*parts, AI_CACHE_VERSION], ensure_ascii=False, default=str)
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def ai_cache_get(key):
+    """Returns a cached, unexpired AI answer from the sqlite cache or None (sync)."""
+    if not os.path.exists(CONFIG["ai_cache_path"]):
+        return None
+    try:
+        with closing(sqlite3.connect(CONFIG["ai_cache_path"])) as conn:
+            row = conn.execute(
+                "SELECT value FROM ai_cache WHERE key = ? AND expires > ?",
+                (key, time.time()),
+            ).fetchone()
+        return row[0] if row else None
+    except sqlite3.Error:
+        return None
+
+
+def ai_cache_set(key, value):
+    """Stores an AI answer in the sqlite cache for ai_cache_ttl seconds (sync)."""
+    try:
+        os.makedirs(os.path.dirname(CONFIG["ai_cache_path"]) or ".", exist_ok=True)
+        with closing(sqlite3.connect(CONFIG["ai_cache_path"])) as conn, conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS ai_cache (key TEXT PRIMARY KEY, value TEXT, expires REAL)"
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO ai_cache VALUES (?, ?, ?)",
+                (key, value, time.time() + CONFIG["ai_cache_ttl"]),
+            )
+    except sqlite3.Error as e:
+        print(f"Warning: Could not write AI cache: {e}")
+
+
+async def query_ai_analysis_async(session, result, source_code="N/A"):
+    """Async: Queries solution + tags in one AI call, reusing the answer for identical failures."""
+    if skip_ai_calls(result):
+        return {"solution": "N/A (Skipped/Working)", "tags": []}
+    cache_key = hashlib.blake2b(
+        "|".join(
+            (
+                str(result.get("status", "")),
+                (result.get("error") or "")[:200],
+                source_code,
+            )
+        ).encode("utf-8"),
+        digest_size=16,
+    ).hexdigest()
+    if cache_key in _ai_analysis_cache:
+        return await asyncio.shield(_ai_analysis_cache[cache_key])
+
+    future = asyncio.get_running_loop().create_future()
+    _ai_analysis_cache[cache_key] = future
+    disk_key = ai_cache_key(
+        "analysis",
+        result.get("status"),
+        result.get("error"),
+        result.get("provider"),
+        result.get("model_tested"),
+    )
+    try:
+        cached = await asyncio.to_thread(ai_cache_get, disk_key)
+        if cached is not None:
+            analysis = json.loads(cached)
+        else:
+            analysis = await _query_ai_analysis_async(session, result, source_code)
+            if not is_ai_failure(analysis["solution"]):
+                await asyncio.to_thread(
+                    ai_cache_set, disk_key, json.dumps(analysis, ensure_ascii=False)
+                )
+    except BaseException:
+        _ai_analysis_cache.pop(cache_key, None)
+        future.cancel()
+        raise
+    if is_ai_failure(analysis["solution"]):
+        _ai_analysis_cache.pop(cache_key, None)  # Let later duplicates retry
+    future.set_result(analysis)
+    return analysis
+
+
+def parse_ai_analysis(raw_response):
+    """Parses the {"solution", "tags"} JSON answer, plain text becomes the solution."""
+    try:
+        data = json_loads(raw_response.strip().removeprefix("```json").strip("`\n "))
+    except ValueError:
+        return {"solution": raw_response, "tags": []}
+    if not isinstance(data, dict):
+        return {"solution": raw_response, "tags": []}
+    tags = data.get("tags") or []
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    return {
+        "solution": str(data.get("solution") or raw_response).strip(),
+        "tags": [str(tag).strip() for tag in tags if str(tag).strip()][:5],
+    }
+
+
+async def _query_ai_analysis_async(session, result, source_code):
+    """Async: Queries the external AI for troubleshooting, analysis and tags."""
     # Warning for external endpoint
     # if not CONFIG["ai_solution_endpoint_url"].startswith("http://localhost"): print("\033[91m      W (Solusi): Ext!\033[0m", end='')
 
     params_str = json.dumps(
         result.get("provider_parameters", {}), indent=2, default=str
     )
-    source_code = result.get("provider_source_code", "N/A")
-    if len(source_code) > CONFIG["max_source_code_length"]:
-        source_code = (
-            source_code[: CONFIG["max_source_code_length"]] + "\n\n... [TRUNCATED]"
-        )
-        # print("\n      I (Solusi): Truncated.", end='')
-
     user_prompt = (
         f"Analisis Masalah & Kode Provider API LLM:\n"
         f"Provider: {result.get('provider', 'N/A')} (ID: {result.get('id', 'N/A')}), Status: {result.get('status', 'N/A')}\n"
         f"Hasil: {result.get('prompts_successful_count', 'N/A')}/{result.get('prompts_tested_count', 'N/A')} OK, AvgTime: {result.get('response_time', 'N/A')}s\n"
+        f"Auth:{'Y' if result.get('needs_auth_flag', False) else 'N'}, Fallback:{'Y' if result.get('fallback', False) else 'N'}\n"
         f"Error: {result.get('error', 'Tidak ada')}\n"
         f"Path: {result.get('provider_file_path', 'N/A')}\n"
         f"Params:\n{params_str}\n"
         f"Code:\n```python\n{source_code}\n```\n"
-        f"Tugas: 1. Advice Troubleshooting (penyebab utama, 3-5 langkah solusi). 2. Analisa Kode & Param (2-4 potensi masalah).\nBhs Indonesia."
+        f"Tugas: 1. Advice Troubleshooting (penyebab utama, 3-5 langkah solusi). 2. Analisa Kode & Param (2-4 potensi masalah). "
+        f"3. 2-5 tag deskriptif (stabilitas, kecepatan, auth, masalah utama). Contoh: Stable, Fast, NeedsAuth, Unstable, Slow, CodeIssue, FreeTier.\n"
+        f"Format Output: JSON dengan key 'solution' (string, jawaban tugas 1 & 2) dan 'tags' (array tag singkat).\nBhs Indonesia."
     )
     payload = {
         "messages": [
             {
                 "role": "system",
-                "content": "AI engineer ahli troubleshoot & analisis kode Python LLM. Bhs Indonesia.",
+                "content": "AI engineer ahli troubleshoot & analisis kode Python LLM. Bhs Indonesia. Output HANYA JSON.",
             },
             {"role": "user", "content": user_prompt},
         ],
         "model": CONFIG["ai_solution_model"],
         "provider": "",
-        "stream": False,
+        "stream": True,
+        "response_format": {"type": "json_object"},
     }
-    return await _call_external_ai_async(session, payload, purpose="solusi & analisa")
+    raw_response = await _call_external_ai_async(
+        session, payload, purpose="solusi, analisa & tags"
+    )
+    if is_ai_failure(raw_response):
+        return {"solution": raw_response, "tags": []}
+    return parse_ai_analysis(raw_response)
 
 
 async def query_ai_tags_async(session, result):
-    """Async: Queries the external AI to generate descriptive tags."""
+    """Async: Tags-only AI query, reusing the answer for identical (status, error) pairs."""
+    if skip_ai_calls(result):
+        return []
+    disk_key = ai_cache_key("tags", result.get("status"), result.get("error"))
+    if disk_key in _ai_tags_cache:
+        return list(await asyncio.shield(_ai_tags_cache[disk_key]))
+
+    future = asyncio.get_running_loop().create_future()
+    _ai_tags_cache[disk_key] = future
+    try:
+        cached_tags = await asyncio.to_thread(ai_cache_get, disk_key)
+        if cached_tags is not None:
+            tags = json.loads(cached_tags)
+        else:
+            tags = await _query_ai_tags_async(session, result)
+            if tags:
+                await asyncio.to_thread(
+                    ai_cache_set, disk_key, json.dumps(tags, ensure_ascii=False)
+                )
+    except BaseException:
+        _ai_tags_cache.pop(disk_key, None)
+        future.cancel()
+        raise
+    if not tags:
+        _ai_tags_cache.pop(disk_key, None)  # Let later duplicates retry
+    future.set_result(tags)
+    return list(tags)
+
+
+async def _query_ai_tags_async(session, result):
+    """Async: Queries the external AI for 2-5 descriptive tags."""
     # if not CONFIG["ai_solution_endpoint_url"].startswith("http://localhost"): print("\033[91m      W (Tags): Ext!\033[0m", end='')
 
     error_summary = (result.get("error") or "Tidak ada")[:100]
@@ -563,10 +867,10 @@ async def query_ai_tags_async(session, result):
         ],
         "model": CONFIG["ai_solution_model"],
         "provider": "",
-        "stream": False,
+        "stream": True,
     }
     raw_tags_response = await _call_external_ai_async(session, payload, purpose="tags")
-    if raw_tags_response and "Gagal" not in raw_tags_response:
+    if raw_tags_response and not is_ai_failure(raw_tags_response):
         tags = [tag.strip() for tag in raw_tags_response.split(",") if tag.strip()]
         return tags[:5]
     else:
@@ -577,16 +881,18 @@ async def query_ai_tags_async(session, result):
 
 
 async def run_g4f_create_async(provider_obj, model, messages):
-    """Runs the synchronous g4f ChatCompletion.create in a thread."""
+    """Runs the synchronous g4f ChatCompletion.create in G4F_EXECUTOR."""
     loop = asyncio.get_running_loop()
     try:
-        # Use asyncio.to_thread to run the potentially blocking sync call
-        response = await asyncio.to_thread(
-            ChatCompletion.create,
-            model=model,
-            messages=messages,
-            provider=provider_obj,
-            # Pass other necessary kwargs if ChatCompletion.create needs them
+        response = await loop.run_in_executor(
+            G4F_EXECUTOR,
+            functools.partial(
+                ChatCompletion.create,
+                model=model,
+                messages=messages,
+                provider=provider_obj,
+                # Pass other necessary kwargs if ChatCompletion.create needs them
+            ),
         )
         return response
     except Exception as e:
@@ -604,36 +910,26 @@ async def test_single_prompt(
     prompt_success = False
     prompt_error = None
     prompt_duration = 0
-    response_str = None
 
     try:
-        # Use asyncio.wait_for for timeout on the g4f call
-        response = await asyncio.wait_for(
-            run_g4f_create_async(
-                provider_obj,
-                current_model_to_use,
-                [{"role": "user", "content": prompt_content}],
-            ),
-            timeout=CONFIG["provider_test_timeout"],
+        # Timeout is enforced by the caller (run_prompts)
+        await run_g4f_create_async(
+            provider_obj,
+            current_model_to_use,
+            [{"role": "user", "content": prompt_content}],
         )
         prompt_duration = round(time.time() - start_time, 2)
         prompt_success = True
-        response_str = str(
-            response
-        )  # Store response if needed later, currently not used much
-    except asyncio.TimeoutError:
-        prompt_duration = round(time.time() - start_time, 2)
-        prompt_error = f"Timeout after {CONFIG['provider_test_timeout']}s"
     except Exception as e:
         prompt_duration = round(time.time() - start_time, 2)
         prompt_error = str(e)
-        # traceback.print_exc() # Uncomment for full traceback during debugging
 
-    # Log outcome (can be made less verbose)
-    status_char = "✅" if prompt_success else "❌"
-    tqdm.write(
-        f"    - P{prompt_index + 1} [{prompt_type}] '{current_model_to_use[:15]}' {status_char} ({prompt_duration}s){' Err: ' + prompt_error[:50] + '...' if prompt_error else ''}"
-    )
+    # Log outcome, the line is only formatted when verbose
+    if CONFIG["verbose"]:
+        status_char = "✅" if prompt_success else "❌"
+        tqdm.write(
+            f"    - P{prompt_index + 1} [{prompt_type}] '{current_model_to_use[:15]}' {status_char} ({prompt_duration}s){' Err: ' + prompt_error[:50] + '...' if prompt_error else ''}"
+        )
 
     return {
         "type": prompt_type,
@@ -644,188 +940,234 @@ async def test_single_prompt(
     }
 
 
-async def test_provider_async(provider_name, provider_obj, session, semaphore):
-    """Async: Tests a single provider with multiple prompts, calls AI, returns full result."""
-    async with semaphore:  # Control concurrency
-        # tqdm.write(f"\n🧪 Pengujian Async: {provider_name}") # tqdm handles description now
-        provider_id = generate_provider_id(provider_name)
-        if not provider_id:
-            return None  # Cannot proceed without ID
-
-        # Get provider details (synchronously, acceptable as it's mostly CPU/local I/O)
-        provider_details = get_provider_details(provider_obj)
-        # tqdm.write(f"  -> Path: {os.path.basename(provider_details['provider_file_path'])}")
-
-        now = datetime.datetime.now().isoformat()
-        needs_auth = getattr(provider_obj, "needs_auth", False)
-
-        prompt_results_agg = []  # To store results from await asyncio.gather
-        successful_prompts_count = 0
-        total_duration_successful = 0
-        combined_errors = []
-        used_fallback_model = None
-        initial_model = "gpt-3.5-turbo"
-
-        current_model_to_use = initial_model
-        # First prompt test (sequential to check for fallback)
-        first_prompt_result = await test_single_prompt(
-            provider_obj, PROMPTS_TO_RUN[0], current_model_to_use, 0
+async def run_prompts(provider_obj, prompts, model, start_index=0):
+    """Async: Runs prompts concurrently, cancels those still pending after the timeout."""
+    if not prompts:
+        return []
+    # TaskGroup (Python 3.11+) waits for cancelled stragglers before returning,
+    # so no prompt task outlives its provider test
+    async with asyncio.TaskGroup() as tg:
+        tasks = [
+            tg.create_task(
+                test_single_prompt(provider_obj, prompt_info, model, start_index + i)
+            )
+            for i, prompt_info in enumerate(prompts)
+        ]
+        done, pending = await asyncio.wait(
+            tasks, timeout=CONFIG["provider_test_timeout"]
+        )
+        for task in pending:
+            task.cancel()
+
+    results = []
+    for i, (prompt_info, task) in enumerate(zip(prompts, tasks)):
+        if task in done:
+            results.append(task.result())
+            continue
+        timeout_error = f"Timeout after {CONFIG['provider_test_timeout']}s"
+        if CONFIG["verbose"]:
+            tqdm.write(
+                f"    - P{start_index + i + 1} [{prompt_info['type']}] '{model[:15]}' ❌ ({CONFIG['provider_test_timeout']}s) Err: {timeout_error}"
+            )
+        results.append(
+            {
+                "type": prompt_info["type"],
+                "model_used": model,
+                "success": False,
+                "duration": CONFIG["provider_test_timeout"],
+                "error": timeout_error,
+            }
         )
-        prompt_results_agg.append(first_prompt_result)
+    return results
 
-        # Check for fallback based on first prompt result
-        if not first_prompt_result["success"] and first_prompt_result["error"]:
-            prompt_error = first_prompt_result["error"]
-            if (
-                "Model is not supported" in prompt_error
-                or "Invalid model" in prompt_error
-            ):
-                match = re.search(
-                    r"(?:Valid|Available|Supported)\smodels?:\s*(\[.*?\]|\{.*?\}|\S+)",
-                    prompt_error,
-                    re.IGNORECASE,
-                )
-                if match:
-                    models_str = match.group(1)
-                    extracted_fallback = None
+
+async def probe_first(provider_name, provider_obj, initial_model="gpt-3.5-turbo"):
+    """Async: Runs the first prompt and detects a fallback model, returns (result, fallback_model)."""
+    (first_prompt_result,) = await run_prompts(
+        provider_obj, PROMPTS_TO_RUN[:1], initial_model
+    )
+
+    used_fallback_model = None
+    # Check for fallback based on first prompt result
+    if not first_prompt_result["success"] and first_prompt_result["error"]:
+        prompt_error = first_prompt_result["error"]
+        if "Model is not supported" in prompt_error or "Invalid model" in prompt_error:
+            match = _VALID_MODELS_RE.search(prompt_error)
+            if match:
+                models_str = match.group(1)
+                # Never eval text from an upstream error message, literal_eval only
+                # accepts literals; fall back to the regex for truncated lists
+                valid_models = []
+                if models_str[:1] in ("[", "{"):
                     try:
-                        if models_str.startswith("["):
-                            valid_models = eval(models_str)
-                        elif models_str.startswith("{"):
-                            valid_models = list(eval(models_str))
-                        else:
-                            valid_models = [models_str.strip("'\"")]
-                        if valid_models:
-                            for model in valid_models:
-                                if model != initial_model:
-                                    extracted_fallback = model
-                                    break
-                            if extracted_fallback:
-                                tqdm.write(
-                                    f"      ♻️ Fallback activated: '{extracted_fallback}' for {provider_name}"
-                                )
-                                used_fallback_model = extracted_fallback
-                    except Exception:
+                        valid_models = [str(m) for m in ast.literal_eval(models_str)]
+                    except (ValueError, SyntaxError, TypeError):
                         pass
+                if not valid_models:
+                    valid_models = _MODEL_LIST_RE.findall(models_str) or [
+                        models_str.strip("'\"[]{} ")
+                    ]
+                extracted_fallback = None
+                for model in valid_models:
+                    if model and model != initial_model:
+                        extracted_fallback = model
+                        break
+                if extracted_fallback:
+                    tqdm.write(
+                        f"      ♻️ Fallback activated: '{extracted_fallback}' for {provider_name}"
+                    )
+                    used_fallback_model = extracted_fallback
+    return first_prompt_result, used_fallback_model
+
+
+async def probe_rest(provider_obj, model):
+    """Async: Runs the remaining prompts concurrently with the given model."""
+    return await run_prompts(provider_obj, PROMPTS_TO_RUN[1:], model, start_index=1)
+
+
+async def test_provider_async(
+    provider_name, provider_obj, session, first_prompt_result, used_fallback_model
+):
+    """Async: Runs the remaining prompts after probe_first, calls AI, returns full result."""
+    provider_id = generate_provider_id(provider_name)
+    if not provider_id:
+        return None  # Cannot proceed without ID
+
+    # Get provider details (synchronously, acceptable as it's mostly CPU/local I/O)
+    provider_details = get_provider_details(provider_obj)
+
+    now = datetime.datetime.now().isoformat()
+    needs_auth = getattr(provider_obj, "needs_auth", False)
+
+    successful_prompts_count = 0
+    total_duration_successful = 0
+    combined_errors = []
+    initial_model = first_prompt_result["model_used"]
+
+    # Run remaining prompts concurrently, using the fallback if activated
+    prompt_results_agg = [first_prompt_result]
+    prompt_results_agg.extend(
+        await probe_rest(provider_obj, used_fallback_model or initial_model)
+    )
 
-        # Run remaining prompts concurrently if any
-        remaining_prompts = PROMPTS_TO_RUN[1:]
-        if remaining_prompts:
-            current_model_to_use = (
-                used_fallback_model or initial_model
-            )  # Use fallback if activated
-            tasks = [
-                test_single_prompt(
-                    provider_obj, prompt_info, current_model_to_use, i + 1
-                )
-                for i, prompt_info in enumerate(remaining_prompts)
-            ]
-            remaining_results = await asyncio.gather(*tasks)
-            prompt_results_agg.extend(remaining_results)
-
-        # Aggregate results from all prompts
-        for res in prompt_results_agg:
-            if res["success"]:
-                successful_prompts_count += 1
-                total_duration_successful += res["duration"]
-            if res["error"]:
-                combined_errors.append(f"P[{res['type']}]: {res['error'][:100]}...")
-
-        # Final result object construction (same as before)
-        overall_success = successful_prompts_count > 0
-        avg_response_time = (
-            total_duration_successful / successful_prompts_count
-            if successful_prompts_count > 0
-            else None
+    # Aggregate results from all prompts
+    for res in prompt_results_agg:
+        if res["success"]:
+            successful_prompts_count += 1
+            total_duration_successful += res["duration"]
+        if res["error"]:
+            combined_errors.append(f"P[{res['type']}]: {res['error'][:100]}...")
+
+    # Final result object construction (same as before)
+    overall_success = successful_prompts_count > 0
+    avg_response_time = (
+        total_duration_successful / successful_prompts_count
+        if successful_prompts_count > 0
+        else None
+    )
+    final_error_message = "; ".join(combined_errors) if combined_errors else None
+
+    result = {
+        "id": provider_id,
+        "timestamp": now,
+        "provider": provider_name,
+        "model_tested": initial_model,
+        "prompts_tested_count": len(PROMPTS_TO_RUN),
+        "prompts_successful_count": successful_prompts_count,
+        "success": overall_success,
+        "fallback": used_fallback_model is not None,
+        "fallback_model_used": used_fallback_model,
+        "response_time": avg_response_time,
+        "error": final_error_message,
+        "needs_auth_flag": needs_auth,
+        "provider_file_path": provider_details["provider_file_path"],
+        "provider_parameters": provider_details["provider_parameters"],
+        "status": "❓ Unknown",
+        "advice": None,
+        "ai_solution": None,
+        "tags": [],
+        "score": 0,
+        "rank": None,
+    }
+
+    # Status Evaluation, Advice (Sync functions)
+    result["status"] = evaluate_status_from_logs([result], needs_auth)
+    if result["fallback"] and successful_prompts_count == 0:
+        result["status"] = "❌ Fallback Failed"  # Refined fallback fail status
+    success_ratio = (
+        successful_prompts_count / len(PROMPTS_TO_RUN)
+        if len(PROMPTS_TO_RUN) > 0
+        else 0
+    )
+    result["advice"] = generate_advice(
+        result["status"], result["error"], needs_auth, success_ratio
+    )
+
+    # Async AI Calls (if needed)
+    ai_analysis_needed = (
+        result["status"] not in ["✅ Working", "✅ Mostly Working"]
+        and CONFIG["skip_working_ai_calls"] == False
+        or result["status"] not in ["✅ Working", "✅ Mostly Working"]
+        and CONFIG["skip_working_ai_calls"] == True
+        and result["status"] != "⏳ Slow Response"
+    )  # Also skip slow if skip_working is true
+
+    if ai_analysis_needed:
+        # One AI call returns both the solution and the tags
+        if CONFIG["verbose"]:
+            tqdm.write(f"  🤖 Queuing Solusi/Analisa/Tags AI for {provider_name}...")
+        analysis = await query_ai_analysis_async(
+            session, result, provider_details["provider_source_code"]
         )
-        final_error_message = "; ".join(combined_errors) if combined_errors else None
-
-        result = {
-            "id": provider_id,
-            "timestamp": now,
-            "provider": provider_name,
-            "model_tested": initial_model,
-            "prompts_tested_count": len(PROMPTS_TO_RUN),
-            "prompts_successful_count": successful_prompts_count,
-            "success": overall_success,
-            "fallback": used_fallback_model is not None,
-            "fallback_model_used": used_fallback_model,
-            "response_time": avg_response_time,
-            "error": final_error_message,
-            "needs_auth_flag": needs_auth,
-            "provider_file_path": provider_details["provider_file_path"],
-            "provider_source_code": provider_details[
-                "provider_source_code"
-            ],  # Temp included
-            "provider_parameters": provider_details["provider_parameters"],
-            "status": "❓ Unknown",
-            "advice": None,
-            "ai_solution": None,
-            "tags": [],
-            "score": 0,
-            "rank": None,
-        }
+        result["ai_solution"] = analysis["solution"]
+        result["tags"] = analysis["tags"]
+    else:
+        result["ai_solution"] = "N/A (Skipped/Working)"
+        if CONFIG["verbose"] and not skip_ai_calls(result):
+            tqdm.write(f"  🏷️ Queuing Tags AI for {provider_name}...")
+        result["tags"] = await query_ai_tags_async(session, result)
 
-        # Status Evaluation, Advice (Sync functions)
-        result["status"] = evaluate_status_from_logs([result], needs_auth)
-        if result["fallback"] and successful_prompts_count == 0:
-            result["status"] = "❌ Fallback Failed"  # Refined fallback fail status
-        success_ratio = (
-            successful_prompts_count / len(PROMPTS_TO_RUN)
-            if len(PROMPTS_TO_RUN) > 0
-            else 0
+    # Log AI outcomes
+    if CONFIG["verbose"]:
+        tqdm.write(
+            f"  💡 Solusi AI ({provider_name}): {'OK' if result['ai_solution'] and not is_ai_failure(result['ai_solution']) else ('Skipped' if 'N/A' in result['ai_solution'] else 'FAIL')}"
         )
-        result["advice"] = generate_advice(
-            result["status"], result["error"], needs_auth, success_ratio
+        tqdm.write(
+            f"  🏷️ Tags AI ({provider_name}): {'OK' if result['tags'] else ('Skipped (Working)' if skip_ai_calls(result) else 'FAIL')}"
         )
 
-        # Async AI Calls (if needed)
-        ai_analysis_needed = (
-            result["status"] not in ["✅ Working", "✅ Mostly Working"]
-            and CONFIG["skip_working_ai_calls"] == False
-            or result["status"] not in ["✅ Working", "✅ Mostly Working"]
-            and CONFIG["skip_working_ai_calls"] == True
-            and result["status"] != "⏳ Slow Response"
-        )  # Also skip slow if skip_working is true
-
-        ai_tasks = []
-        if ai_analysis_needed:
-            tqdm.write(f"  🤖 Queuing Solusi/Analisa AI for {provider_name}...")
-            ai_tasks.append(query_openai_solution_async(session, result))
-        else:
-            result["ai_solution"] = "N/A (Skipped/Working)"
-            ai_tasks.append(
-                asyncio.sleep(0, result="N/A (Skipped/Working)")
-            )  # Placeholder task
+    success_ratio_str = f"{result.get('prompts_successful_count', '?')}/{result.get('prompts_tested_count', '?')}"
+    tqdm.write(
+        f"🏁 Hasil Async '{provider_name}': Status={result['status']}, OK: {success_ratio_str}, Time: {result['response_time'] or 'N/A'}s"
+    )
 
-        tqdm.write(f"  🏷️ Queuing Tags AI for {provider_name}...")
-        ai_tasks.append(query_ai_tags_async(session, result))
+    # Merge into the in-memory database, the flusher writes it out
+    await update_database_entry(result)
 
-        # Run AI calls concurrently
-        ai_results = await asyncio.gather(*ai_tasks)
+    return result  # Return result (might not be strictly needed if DB update happens here)
 
-        # Assign results back (handling potential N/A placeholders)
-        if ai_results[0] != "N/A (Skipped/Working)":
-            result["ai_solution"] = ai_results[0]
-        result["tags"] = ai_results[1] if isinstance(ai_results[1], list) else []
 
-        # Log AI outcomes
-        tqdm.write(
-            f"  💡 Solusi AI ({provider_name}): {'OK' if result['ai_solution'] and 'Gagal' not in result['ai_solution'] else ('Skipped' if 'N/A' in result['ai_solution'] else 'FAIL')}"
-        )
-        tqdm.write(
-            f"  🏷️ Tags AI ({provider_name}): {'OK' if result['tags'] else 'FAIL'}"
-        )
+async def gather_bounded(factories, desc, limit=None):
+    """Runs coroutine factories with at most `limit` in flight, results in input order.
 
-        success_ratio_str = f"{result.get('prompts_successful_count', '?')}/{result.get('prompts_tested_count', '?')}"
-        tqdm.write(
-            f"🏁 Hasil Async '{provider_name}': Status={result['status']}, OK: {success_ratio_str}, Time: {result['response_time'] or 'N/A'}s"
-        )
+    Coroutines are only created when a worker picks them up, so waiting providers
+    hold no task or coroutine frame.
+    """
+    limit = limit or CONFIG["max_concurrent_tests"]
+    results = [None] * len(factories)
+    pending = iter(enumerate(factories))
+    with tqdm(total=len(factories), desc=desc, unit="prov") as progress:
 
-        # Update database immediately after processing this provider
-        await update_database_entry(result)
+        async def worker():
+            for index, factory in pending:
+                results[index] = await factory()
+                progress.update()
 
-        return result  # Return result (might not be strictly needed if DB update happens here)
+        # TaskGroup cancels the remaining workers if one fails or the run is interrupted
+        async with asyncio.TaskGroup() as tg:
+            for _ in range(min(limit, len(factories))):
+                tg.create_task(worker())
+    return results
 
 
 async def test_all_providers_async():
@@ -833,47 +1175,80 @@ async def test_all_providers_async():
     print(
         f"🚀 Memulai Pengujian Async ({len(PROMPTS_TO_RUN)} prompt, maks {CONFIG['max_concurrent_tests']} konkurensi)..."
     )
-    initial_data = load_results_sync()  # Load sync at start
+    initial_data = await load_results_async()  # Load once at start
+    db_state.update({item["id"]: item for item in initial_data if "id" in item})
+    db_unkeyed[:] = [item for item in initial_data if "id" not in item]
+    db_sorted_ids[:] = sorted(db_state)
     print(f"💾 Ditemukan {len(initial_data)} data provider (akan diupdate).")
 
     try:
-        all_provider_names = list(ProviderUtils.convert.keys())
+        # Snapshot (name, obj) pairs once, None entries are skipped
+        providers = tuple(
+            (name, obj) for name, obj in ProviderUtils.convert.items() if obj is not None
+        )
     except Exception as e:
         print(f"FATAL: Gagal mendapatkan daftar provider: {e}")
         return
-    print(f"🔍 Ditemukan {len(all_provider_names)} provider untuk diuji.")
+    print(f"🔍 Ditemukan {len(providers)} provider untuk diuji.")
+
+    if hasattr(asyncio, "eager_task_factory"):  # Python 3.12+
+        # Tasks run until their first suspension without a scheduler round trip
+        asyncio.get_running_loop().set_task_factory(asyncio.eager_task_factory)
 
-    semaphore = asyncio.Semaphore(CONFIG["max_concurrent_tests"])
-    tasks = []
+    # Pooled connector: AI calls reuse keep-alive sockets and cached DNS lookups
+    # limit=0: only the AI endpoint is called, limit_per_host is the real bound
     connector = aiohttp.TCPConnector(
-        limit_per_host=CONFIG["max_concurrent_tests"]
-    )  # Limit connections per host for AI endpoint
+        limit=0,
+        limit_per_host=CONFIG["max_concurrent_tests"],
+        ttl_dns_cache=300,
+        keepalive_timeout=60,
+        enable_cleanup_closed=True,
+    )
     async with aiohttp.ClientSession(
-        connector=connector
+        connector=connector,
+        # No total cap so streamed answers may run long, but stalls still time out
+        timeout=aiohttp.ClientTimeout(
+            total=None, connect=10, sock_read=CONFIG["request_timeout"]
+        ),
+        headers={"accept": "application/json", "Content-Type": "application/json"},
+        json_serialize=json_dumps,
     ) as session:  # Create one session
-        for provider_name in all_provider_names:
-            try:
-                provider_obj = ProviderUtils.convert.get(provider_name)
-            except Exception as e:
-                print(f"❓ Gagal get obj '{provider_name}': {e}. Skipping.")
-                continue
-            if provider_obj is None:
-                print(f"❓ Provider '{provider_name}' tidak ditemukan. Skipping.")
-                continue
-
-            # Create a task for each provider test
-            task = asyncio.create_task(
-                test_provider_async(provider_name, provider_obj, session, semaphore)
+        global ai_queue
+        ai_queue = asyncio.Queue()
+        ai_workers = [
+            asyncio.create_task(ai_worker(ai_queue))
+            for _ in range(CONFIG["ai_max_concurrency"])
+        ]
+        flusher = asyncio.create_task(db_flusher())
+        try:
+            # Pass 1: first prompt for every provider, detects fallback models
+            firsts = await gather_bounded(
+                [functools.partial(probe_first, name, obj) for name, obj in providers],
+                desc="🔍 Prompt Pertama",
             )
-            tasks.append(task)
-
-        # Use tqdm.gather to show progress
-        results = await tqdm.gather(*tasks, desc="🔍 Menguji Provider", unit="prov")
-        # results list will contain the return value of test_provider_async or None if it failed early
+            # Pass 2: remaining prompts, AI calls and database update
+            results = await gather_bounded(
+                [
+                    functools.partial(
+                        test_provider_async, name, obj, session, first, fallback
+                    )
+                    for (name, obj), (first, fallback) in zip(providers, firsts)
+                ],
+                desc="🔍 Menguji Provider",
+            )
+            # results list will contain the return value of test_provider_async or None if it failed early
+        finally:
+            # Wait for the flusher and workers to stop, so no write races the final
+            # save below and in-flight AI requests finish before the session closes
+            flusher.cancel()
+            for worker in ai_workers:
+                worker.cancel()
+            await asyncio.gather(flusher, *ai_workers, return_exceptions=True)
+            ai_queue = None
 
     print("\n✅ Semua pengujian provider selesai. Memuat data akhir untuk ranking...")
-    # Load final data after all updates are done
-    final_data = load_results_sync()
+    # In-memory state already holds every update, the final save replaces pending flushes
+    final_data = db_unkeyed + list(db_state.values())
 
     # Rank the final data
     ranked_data = rank_providers(final_data)  # Sync ranking function
@@ -904,5 +1279,9 @@ if __name__ == "__main__":
     except KeyboardInterrupt:
         print("\n🚫 Proses dihentikan oleh pengguna.")
     except Exception:
+        import traceback
+
         print("\n💥 Terjadi error tidak terduga di proses utama:")
         traceback.print_exc()
+    finally:
+        G4F_EXECUTOR.shutdown(wait=False, cancel_futures=True)
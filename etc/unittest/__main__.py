@@ -14,6 +14,7 @@ from .include import *
 from .retry_provider import *
 from .thinking import *
 from .web_search import *
+from .jmuz import *
 from .models import *
 
 unittest.main()
\ No newline at end of file
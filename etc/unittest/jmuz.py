@@ -0,0 +1,35 @@
+import asyncio
+import unittest
+from itertools import combinations
+from unittest.mock import patch
+
+from g4f.Provider import Jmuz
+from g4f.Provider.template import OpenaiTemplate
+
+STREAM = "Join for free at x\nhttps://discord.gg/abc ...\nHello world!"
+EXPECTED = "Hello world!"
+
+def collect(chunks: list) -> str:
+    async def create_async_generator(cls, *args, **kwargs):
+        for chunk in chunks:
+            yield chunk
+    async def run():
+        with patch.object(OpenaiTemplate, "create_async_generator", classmethod(create_async_generator)):
+            return "".join([chunk async for chunk in Jmuz.create_async_generator("", [])])
+    return asyncio.run(run())
+
+class TestJmuzAds(unittest.TestCase):
+    def test_single_chunk(self):
+        self.assertEqual(collect([STREAM]), EXPECTED)
+
+    def test_single_char_chunks(self):
+        self.assertEqual(collect(list(STREAM)), EXPECTED)
+
+    def test_text_after_ad_in_same_chunk(self):
+        chunks = ["Join ", "for fre", "e", " at x\nH", "ello", " world!"]
+        self.assertEqual(collect(chunks), EXPECTED)
+
+    def test_all_three_chunk_splits(self):
+        for i, j in combinations(range(1, len(STREAM)), 2):
+            chunks = [STREAM[:i], STREAM[i:j], STREAM[j:]]
+            self.assertEqual(collect(chunks), EXPECTED, chunks)
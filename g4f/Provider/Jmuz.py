@@ -3,6 +3,11 @@ from __future__ import annotations
 from ..typing import AsyncResult, Messages
 from .template import OpenaiTemplate
 
+# Ads injected by the API: the first two span a whole line, the invite ends with "..."
+LINE_ADS = ("Join for free", "o1-preview")
+DISCORD_AD = "https://discord.gg/"
+ALL_ADS = LINE_ADS + (DISCORD_AD,)
+
 class Jmuz(OpenaiTemplate):
     url = "https://discord.gg/Ew6JzjA2NR"
     api_base = "https://jmuz.me/gpt/api/v2"
@@ -44,6 +49,7 @@ class Jmuz(OpenaiTemplate):
 
         started = False
         buffer = ""
+        skip_until = None
         async for chunk in super().create_async_generator(
             model=model,
             messages=messages,
@@ -55,23 +61,30 @@ class Jmuz(OpenaiTemplate):
         ):
             if isinstance(chunk, str):
                 buffer += chunk
-                if "Join for free".startswith(buffer) or buffer.startswith("Join for free"):
-                    if buffer.endswith("\n"):
-                        buffer = ""
-                    continue
-                if "https://discord.gg/".startswith(buffer) or "https://discord.gg/" in buffer:
-                    if "..." in buffer:
-                        buffer = ""
-                    continue
-                if "o1-preview".startswith(buffer) or buffer.startswith("o1-preview"):
-                    if "\n" in buffer:
+                while buffer:
+                    if skip_until is None:
+                        if buffer.startswith(LINE_ADS):
+                            skip_until = "\n"
+                        elif DISCORD_AD in buffer:
+                            buffer = buffer[buffer.index(DISCORD_AD):]
+                            skip_until = "..."
+                    if skip_until is not None:
+                        end = buffer.find(skip_until)
+                        if end == -1:
+                            # Inside an ad line, only keep enough text to find where it ends
+                            buffer = buffer[-len(skip_until):]
+                            break
+                        # Text after the ad goes through the same checks as a new chunk
+                        buffer = buffer[end + len(skip_until):]
+                        skip_until = None
+                        continue
+                    if any(ad.startswith(buffer) for ad in ALL_ADS):
+                        break
+                    if not started:
+                        buffer = buffer.lstrip()
+                    if buffer:
+                        started = True
+                        yield buffer
                         buffer = ""
-                    continue
-                if not started:
-                    buffer = buffer.lstrip()
-                if buffer:
-                    started = True
-                    yield buffer
-                    buffer = ""
             else:
                 yield chunk
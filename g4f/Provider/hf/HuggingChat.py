@@ -1,11 +1,14 @@
 from __future__ import annotations
 
+import asyncio
 import json
 import re
 import os
 import requests
 import base64
+import time
 import uuid
+from pathlib import Path
 from typing import AsyncIterator
 
 try:
@@ -15,6 +18,11 @@ try:
 except ImportError:
     has_curl_cffi = False
 
+try:
+    from orjson import loads as json_loads  # Raises a json.JSONDecodeError subclass
+except ImportError:
+    json_loads = json.loads
+
 from ..base_provider import ProviderModelMixin, AsyncAuthedProvider, AuthResult
 from ..helper import format_prompt, format_image_prompt, get_last_user_message
 from ...typing import AsyncResult, Messages, Cookies, MediaListType
@@ -23,11 +31,48 @@ from ...image import to_bytes
 from ...requests import get_args_from_nodriver, DEFAULT_HEADERS
 from ...requests.raise_for_status import raise_for_status
 from ...providers.response import JsonConversation, ImageResponse, Sources, TitleGeneration, Reasoning, RequestLogin, FinishReason
-from ...cookies import get_cookies
+from ...cookies import get_cookies, get_cookies_dir
 from ...tools.media import merge_media
 from .models import default_model, default_vision_model, fallback_models, image_models, model_aliases
 from ... import debug
 
+SPECIAL_CHARS_PATTERN = re.compile(r'["\\\[\]{}]')
+PARAMETERS_PATTERN = re.compile(r',parameters:{[^}]+?}')
+UNQUOTED_KEY_PATTERN = re.compile(r'([{,])([A-Za-z0-9_]+?):')
+
+def find_models_array(text: str) -> str:
+    """Returns the `models:[...]` array literal that is followed by `,oldModels:`."""
+    start = text.find("models:[")
+    while start != -1:
+        start += len("models:")
+        depth = 0
+        in_string = False
+        skip_until = 0
+        end = len(text)
+        # Jump between brackets and quotes only, instead of backtracking over the page
+        for match in SPECIAL_CHARS_PATTERN.finditer(text, start):
+            char, position = match.group(), match.start()
+            if position < skip_until:
+                continue
+            if in_string:
+                if char == "\\":
+                    skip_until = position + 2
+                elif char == '"':
+                    in_string = False
+            elif char == '"':
+                in_string = True
+            elif char in "[{":
+                depth += 1
+            elif char in "]}":
+                depth -= 1
+                if depth == 0:
+                    end = position + 1
+                    break
+        if text.startswith(",oldModels:", end):
+            return text[start:end]
+        start = text.find("models:[", start)
+    raise ValueError("Models list not found")
+
 class Conversation(JsonConversation):
     def __init__(self, models: dict):
         self.models: dict = models
@@ -46,25 +91,44 @@ class HuggingChat(AsyncAuthedProvider, ProviderModelMixin):
     model_aliases = model_aliases
     image_models = image_models
     text_models = fallback_models
+    models_cache_ttl = 24 * 60 * 60
 
     @classmethod
     def get_models(cls):
         if not cls.models:
+            cache_file = Path(get_cookies_dir()) / f"{cls.__name__.lower()}_models.json"
+            try:
+                if cache_file.exists() and time.time() - cache_file.stat().st_mtime < cls.models_cache_ttl:
+                    with open(cache_file, 'r') as f:
+                        data = json.load(f)
+                    cls.text_models = data["text_models"]
+                    cls.vision_models = data["vision_models"]
+                    cls.models = cls.text_models + cls.image_models
+                    return cls.models
+            except Exception as e:
+                debug.log(f"{cls.__name__}: Error reading models cache: {e}")
             try:
                 text = requests.get(cls.url).text
-                text = re.search(r'models:(\[.+?\]),oldModels:', text).group(1)
-                text = re.sub(r',parameters:{[^}]+?}', '', text)
+                text = find_models_array(text)
+                text = PARAMETERS_PATTERN.sub('', text)
                 text = text.replace('void 0', 'null')
                 def add_quotation_mark(match):
                     return f'{match.group(1)}"{match.group(2)}":'
-                text = re.sub(r'([{,])([A-Za-z0-9_]+?):', add_quotation_mark, text)
-                models = json.loads(text)
+                text = UNQUOTED_KEY_PATTERN.sub(add_quotation_mark, text)
+                models = json_loads(text)
                 cls.text_models = [model["id"] for model in models] 
                 cls.models = cls.text_models + cls.image_models
                 cls.vision_models = [model["id"] for model in models if model["multimodal"]]
             except Exception as e:
                 debug.error(f"{cls.__name__}: Error reading models: {type(e).__name__}: {e}")
                 cls.models = [*fallback_models]
+                return cls.models
+            try:
+                cache_file.parent.mkdir(parents=True, exist_ok=True)
+                with open(cache_file, 'w') as f:
+                    json.dump({"text_models": cls.text_models, "vision_models": cls.vision_models}, f)
+            except Exception as e:
+                debug.log(f"{cls.__name__}: Error writing models cache: {e}")
         return cls.models
 
     @classmethod
@@ -80,13 +144,22 @@ class HuggingChat(AsyncAuthedProvider, ProviderModelMixin):
             return
         if cls.needs_auth:
             yield RequestLogin(cls.__name__, os.environ.get("G4F_LOGIN_URL") or "")
-            yield AuthResult(
-                **await get_args_from_nodriver(
+            # Load the model list in a thread while the browser login runs
+            models_future = None if cls.models else asyncio.get_running_loop().run_in_executor(None, cls.get_models)
+            try:
+                auth_args = await get_args_from_nodriver(
                     cls.url,
                     proxy=proxy,
                     wait_for='form[action$="/logout"]'
                 )
-            )
+            except BaseException:
+                # Don't hold the login error back until the model request returns
+                if models_future is not None:
+                    models_future.cancel()
+                raise
+            if models_future is not None:
+                await models_future
+            yield AuthResult(**auth_args)
         else:
             yield AuthResult(
                 cookies = {
@@ -120,7 +193,8 @@ class HuggingChat(AsyncAuthedProvider, ProviderModelMixin):
 
         if model not in conversation.models:
             conversationId = cls.create_conversation(session, model)
-            debug.log(f"Conversation created: {json.dumps(conversationId[8:] + '...')}")
+            if debug.logging:
+                debug.log(f"Conversation created: {json.dumps(conversationId[8:] + '...')}")
             messageId = cls.fetch_message_id(session, conversationId)
             conversation.models[model] = {"conversationId": conversationId, "messageId": messageId}
             if return_conversation:
@@ -167,27 +241,29 @@ class HuggingChat(AsyncAuthedProvider, ProviderModelMixin):
             if not line:
                 continue
             try:
-                line = json.loads(line)
+                line = json_loads(line)
             except json.JSONDecodeError as e:
-                debug.error(f"Failed to decode JSON: {line}, error: {e}")
+                if debug.logging:
+                    debug.error(f"Failed to decode JSON: {line}, error: {e}")
                 continue
-            if "type" not in line:
-                raise RuntimeError(f"Response: {line}")
-            elif line["type"] == "stream":
+            line_type = line.get("type")
+            if line_type == "stream":
                 yield line["token"].replace('\u0000', '')
-            elif line["type"] == "finalAnswer":
+            elif line_type is None:
+                raise RuntimeError(f"Response: {line}")
+            elif line_type == "finalAnswer":
                 if sources is not None:
                     yield sources
                 yield FinishReason("stop")
                 break
-            elif line["type"] == "file":
+            elif line_type == "file":
                 url = f"{cls.url}/conversation/{conversationId}/output/{line['sha']}"
                 yield ImageResponse(url, format_image_prompt(messages, prompt), options={"cookies": auth_result.cookies})
-            elif line["type"] == "webSearch" and "sources" in line:
+            elif line_type == "webSearch" and "sources" in line:
                 sources = Sources(line["sources"])
-            elif line["type"] == "title":
+            elif line_type == "title":
                 yield TitleGeneration(line["title"])
-            elif line["type"] == "reasoning":
+            elif line_type == "reasoning":
                 yield Reasoning(line.get("token"), status=line.get("status"))
 
     @classmethod
@@ -211,13 +287,21 @@ class HuggingChat(AsyncAuthedProvider, ProviderModelMixin):
         response = session.get(f'{cls.url}/conversation/{conversation_id}/__data.json?x-sveltekit-invalidated=11')
         raise_for_status(response)
 
-        # Split the response content by newlines and parse each line as JSON
+        # Parse the raw content line by line, stopping at the first line with "nodes"
         try:
             json_data = None
-            for line in response.text.split('\n'):
-                if line.strip():
+            content = response.content
+            start = 0
+            while start < len(content):
+                end = content.find(b'\n', start)
+                if end == -1:
+                    end = len(content)
+                line = content[start:end]
+                start = end + 1
+                # Only lines mentioning "nodes" can match, skip parsing the others
+                if b'"nodes"' in line:
                     try:
-                        parsed = json.loads(line)
+                        parsed = json_loads(line)
                         if isinstance(parsed, dict) and "nodes" in parsed:
                             json_data = parsed
                             break
@@ -227,12 +311,14 @@ class HuggingChat(AsyncAuthedProvider, ProviderModelMixin):
             if not json_data:
                 raise RuntimeError("Failed to parse response data")
 
-            if json_data["nodes"][-1]["type"] == "error":
-                if json_data["nodes"][-1]["status"] == 403:
-                    raise MissingAuthError(json_data["nodes"][-1]["error"]["message"])
-                raise ResponseError(json.dumps(json_data["nodes"][-1]))
+            nodes = json_data["nodes"]
+            last_node = nodes[-1]
+            if last_node["type"] == "error":
+                if last_node["status"] == 403:
+                    raise MissingAuthError(last_node["error"]["message"])
+                raise ResponseError(json.dumps(last_node))
 
-            data = json_data["nodes"][1]["data"]
+            data = nodes[1]["data"]
             keys = data[data[0]["messages"]]
             message_keys = data[keys[-1]]
             return data[message_keys["id"]]
@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import hashlib
 import json
+import time
 import uuid
 
 from ...typing import AsyncResult, Messages, Cookies, MediaListType
@@ -33,17 +35,20 @@ class Microsoft_Phi_4(AsyncGeneratorProvider, ProviderModelMixin):
     vision_models = list(model_aliases.keys())
     models = vision_models
 
+    zerogpu_token_ttl = 120
+    _zerogpu_cache: dict[str, tuple[str, str, float]] = {}
+
     @classmethod
     def run(cls, method: str, session: StreamSession, prompt: str, conversation: JsonConversation, media: list = None):
-            headers = {
+            headers = {k: v for k, v in {
                 "content-type": "application/json",
                 "x-zerogpu-token": conversation.zerogpu_token,
                 "x-zerogpu-uuid": conversation.zerogpu_uuid,
                 "referer": cls.referer,
-            }
+            }.items() if v is not None}
             if method == "predict":
                 return session.post(f"{cls.api_url}/gradio_api/run/predict", **{
-                    "headers": {k: v for k, v in headers.items() if v is not None},
+                    "headers": headers,
                     "json": {
                         "data":[
                             [],
@@ -61,7 +66,7 @@ class Microsoft_Phi_4(AsyncGeneratorProvider, ProviderModelMixin):
                 })
             if method == "post":
                 return session.post(f"{cls.api_url}/gradio_api/queue/join?__theme=light", **{
-                    "headers": {k: v for k, v in headers.items() if v is not None},
+                    "headers": headers,
                     "json": {
                         "data": [[
                                 {
@@ -88,6 +93,21 @@ class Microsoft_Phi_4(AsyncGeneratorProvider, ProviderModelMixin):
                 }
             })
 
+    @classmethod
+    async def get_cached_zerogpu_token(cls, session: StreamSession, conversation: JsonConversation, cookies: Cookies = None):
+        zerogpu_uuid = getattr(conversation, "zerogpu_uuid", None)
+        cache_key = hashlib.blake2b(repr((cls.space, zerogpu_uuid, sorted((cookies or {}).items()))).encode()).hexdigest()
+        cached = cls._zerogpu_cache.get(cache_key)
+        if cached is not None and cached[2] > time.time() + 5:
+            return cached[0], cached[1]
+        zerogpu_uuid, zerogpu_token = await get_zerogpu_token(cls.space, session, conversation, cookies)
+        now = time.time()
+        # Drop expired tokens so the cache doesn't grow with every cookie set seen
+        for key in [key for key, value in cls._zerogpu_cache.items() if value[2] <= now]:
+            del cls._zerogpu_cache[key]
+        cls._zerogpu_cache[cache_key] = (zerogpu_uuid, zerogpu_token, now + cls.zerogpu_token_ttl)
+        return zerogpu_uuid, zerogpu_token
+
     @classmethod
     async def create_async_generator(
         cls,
@@ -109,7 +129,7 @@ class Microsoft_Phi_4(AsyncGeneratorProvider, ProviderModelMixin):
         session_hash = uuid.uuid4().hex if conversation is None else getattr(conversation, "session_hash", uuid.uuid4().hex)
         async with StreamSession(proxy=proxy, impersonate="chrome") as session:
             if api_key is None:
-                zerogpu_uuid, api_key = await get_zerogpu_token(cls.space, session, conversation, cookies)
+                zerogpu_uuid, api_key = await cls.get_cached_zerogpu_token(session, conversation, cookies)
             if conversation is None or not hasattr(conversation, "session_hash"):
                 conversation = JsonConversation(session_hash=session_hash, zerogpu_token=api_key, zerogpu_uuid=zerogpu_uuid)
             else:
@@ -119,13 +139,13 @@ class Microsoft_Phi_4(AsyncGeneratorProvider, ProviderModelMixin):
 
             if media is not None:
                 data = FormData()
-                mime_types = [None for i in range(len(media))]
-                for i in range(len(media)):
-                    mime_types[i] = is_data_an_audio(media[i][0], media[i][1])
-                    media[i] = (to_bytes(media[i][0]), media[i][1])
-                    mime_types[i] = is_accepted_format(media[i][0]) if mime_types[i] is None else mime_types[i]
-                for image, image_name in media:
-                    data.add_field(f"files", to_bytes(image), filename=image_name)
+                mime_types = [None] * len(media)
+                for i, (image, image_name) in enumerate(media):
+                    image_bytes = to_bytes(image)
+                    mime_type = is_data_an_audio(image, image_name)
+                    mime_types[i] = is_accepted_format(image_bytes) if mime_type is None else mime_type
+                    media[i] = (image_bytes, image_name)
+                    data.add_field(f"files", image_bytes, filename=image_name)
                 async with session.post(f"{cls.api_url}/gradio_api/upload", params={"upload_id": session_hash}, data=data) as response:
                     await raise_for_status(response)
                     image_files = await response.json()
@@ -150,7 +170,8 @@ class Microsoft_Phi_4(AsyncGeneratorProvider, ProviderModelMixin):
             async with cls.run("get", session, prompt, conversation) as response:
                 response: StreamResponse = response
                 async for line in response.iter_lines():
-                    if line.startswith(b'data: '):
+                    # Only the process_completed frame is used, skip the others unparsed
+                    if line.startswith(b'data: ') and b'process_completed' in line:
                         try:
                             json_data = json.loads(line[6:])
                             if json_data.get('msg') == 'process_completed':
@@ -9,21 +9,23 @@ import g4f.cookies
 
 def get_api_parser():
     api_parser = ArgumentParser(description="Run the API and GUI")
+    working_providers = [provider for provider in Provider.__providers__ if provider.working]
+    provider_names = [provider.__name__ for provider in working_providers]
     api_parser.add_argument("--bind", default=None, help="The bind string. (Default: 0.0.0.0:1337)")
     api_parser.add_argument("--port", "-p", default=None, help="Change the port of the server.")
     api_parser.add_argument("--debug", "-d", action="store_true", help="Enable verbose logging.")
     api_parser.add_argument("--gui", "-g", default=None, action="store_true", help="Start also the gui.")
     api_parser.add_argument("--model", default=None, help="Default model for chat completion. (incompatible with --reload and --workers)")
-    api_parser.add_argument("--provider", choices=[provider.__name__ for provider in Provider.__providers__ if provider.working],
+    api_parser.add_argument("--provider", choices=provider_names,
                             default=None, help="Default provider for chat completion. (incompatible with --reload and --workers)")
-    api_parser.add_argument("--image-provider", choices=[provider.__name__ for provider in Provider.__providers__ if provider.working and hasattr(provider, "image_models")],
+    api_parser.add_argument("--image-provider", choices=[provider.__name__ for provider in working_providers if hasattr(provider, "image_models")],
                             default=None, help="Default provider for image generation. (incompatible with --reload and --workers)"),
     api_parser.add_argument("--proxy", default=None, help="Default used proxy. (incompatible with --reload and --workers)")
     api_parser.add_argument("--workers", type=int, default=None, help="Number of workers.")
     api_parser.add_argument("--disable-colors", action="store_true", help="Don't use colors.")
     api_parser.add_argument("--ignore-cookie-files", action="store_true", help="Don't read .har and cookie files. (incompatible with --reload and --workers)")
     api_parser.add_argument("--g4f-api-key", type=str, default=None, help="Sets an authentication key for your API. (incompatible with --reload and --workers)")
-    api_parser.add_argument("--ignored-providers", nargs="+", choices=[provider.__name__ for provider in Provider.__providers__ if provider.working],
+    api_parser.add_argument("--ignored-providers", nargs="+", choices=provider_names,
                             default=[], help="List of providers to ignore when processing request. (incompatible with --reload and --workers)")
     api_parser.add_argument("--cookie-browsers", nargs="+", choices=[browser.__name__ for browser in g4f.cookies.browsers],
                             default=[], help="List of browsers to access or retrieve cookies from. (incompatible with --reload and --workers)")
@@ -22,12 +22,19 @@ BUCKET_INSTRUCTIONS = """
 Instruction: Make sure to add the sources of cites using [[domain]](Url) notation after the reference. Example: [[a-z0-9.]](http://example.com)
 """
 
+BUCKET_ID_PATTERN = re.compile(r'{"bucket_id":"([^"]*)"}')
+
 TOOL_NAMES = {
     "SEARCH": "search_tool",
     "CONTINUE": "continue_tool",
     "BUCKET": "bucket_tool"
 }
 
+def get_last_line(text: str) -> str:
+    """Get the last non-empty line of text without splitting all lines"""
+    text = text.rstrip()
+    return text[text.rfind("\n") + 1:]
+
 class ToolHandler:
     """Handles processing of different tool types"""
     
@@ -46,13 +53,13 @@ class ToolHandler:
             
     @staticmethod
     async def process_search_tool(messages: Messages, tool: dict) -> Messages:
-        """Process search tool requests"""
-        messages = messages.copy()
+        """Process search tool requests, replaces the last message in the given list"""
         args = ToolHandler.validate_arguments(tool["function"])
-        messages[-1]["content"], sources = await do_search(
+        content, sources = await do_search(
             messages[-1]["content"],
             **args
         )
+        messages[-1] = {**messages[-1], "content": content}
         return messages, sources
     
     @staticmethod
@@ -61,7 +68,7 @@ class ToolHandler:
         kwargs = {}
         if provider not in ("OpenaiAccount", "HuggingFaceAPI"):
             messages = messages.copy()
-            last_line = messages[-1]["content"].strip().splitlines()[-1]
+            last_line = get_last_line(messages[-1]["content"])
             content = f"Carry on from this point:\n{last_line}"
             messages.append({"role": "user", "content": content})
         else:
@@ -80,7 +87,7 @@ class ToolHandler:
         has_bucket = False
         for message in messages:
             if "content" in message and isinstance(message["content"], str):
-                new_message_content = re.sub(r'{"bucket_id":"([^"]*)"}', on_bucket, message["content"])
+                new_message_content = BUCKET_ID_PATTERN.sub(on_bucket, message["content"])
                 if new_message_content != message["content"]:
                     has_bucket = True
                     message["content"] = new_message_content
@@ -301,7 +308,7 @@ def iter_run_tools(
                     )
                 elif function_name == TOOL_NAMES["CONTINUE"]:
                     if provider not in ("OpenaiAccount", "HuggingFace"):
-                        last_line = messages[-1]["content"].strip().splitlines()[-1]
+                        last_line = get_last_line(messages[-1]["content"])
                         content = f"Carry on from this point:\n{last_line}"
                         messages.append({"role": "user", "content": content})
                     else:
@@ -313,7 +320,7 @@ def iter_run_tools(
                     has_bucket = False
                     for message in messages:
                         if "content" in message and isinstance(message["content"], str):
-                            new_message_content = re.sub(r'{"bucket_id":"([^"]*)"}', on_bucket, message["content"])
+                            new_message_content = BUCKET_ID_PATTERN.sub(on_bucket, message["content"])
                             if new_message_content != message["content"]:
                                 has_bucket = True
                                 message["content"] = new_message_content